@@ -1,4 +1,5 @@
-from typing import Dict, Any, List
+from functools import cached_property
+from typing import Dict, Any, List, FrozenSet
 
 
 class Instruction:
@@ -40,6 +41,13 @@ class BasicBlock(list):
 
         self.branches: bool = len(self.exit_vaddrs) > 1
 
+    @cached_property
+    def regs_written_set(self) -> FrozenSet[str]:
+        """Registers written by any instruction in this block"""
+        return frozenset(
+            reg for instr in self.instructions for reg in instr.regs_written
+        )
+
     def __iter__(self):
         return iter(self.instructions)
 
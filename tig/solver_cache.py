@@ -0,0 +1,248 @@
+import os, sqlite3, hashlib, functools, json
+import angr, claripy, z3
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Location of the persistent cache, shared across runs and processes. Setting
+# TIG_SOLVER_CACHE to an empty string disables the cache.
+CACHE_PATH: Optional[str] = (
+    os.environ.get(
+        "TIG_SOLVER_CACHE",
+        os.path.join(os.path.expanduser("~"), ".cache", "tig", "solver_cache.sqlite"),
+    )
+    or None
+)
+
+
+def set_cache_path(path: Optional[str]):
+    """Point the solver cache at a different database, e.g. one per binary
+
+    The setting is exported through TIG_SOLVER_CACHE so that worker processes
+    pick it up as well.
+
+    Args:
+        path (Optional[str]): Path of the cache database, or None to disable caching
+    """
+    global CACHE_PATH
+    CACHE_PATH = path
+    os.environ["TIG_SOLVER_CACHE"] = path or ""
+    _connection.cache_clear()
+
+
+@functools.lru_cache(maxsize=1)
+def _connection() -> Optional[sqlite3.Connection]:
+    """Open (and create if needed) the on-disk solver cache
+
+    Returns:
+        Optional[sqlite3.Connection]: Autocommitting connection to the cache
+                                      database, or None if caching is disabled
+    """
+    if CACHE_PATH is None:
+        return None
+    os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT)"
+    )
+    return conn
+
+
+def z3_variables(asts: List[z3.ExprRef]) -> List[z3.ExprRef]:
+    """Collect the variables of Z3 expressions in first-occurrence order
+
+    Shared subterms are visited once, so this is linear in the size of the DAG
+    rather than of the expanded tree.
+
+    Args:
+        asts (List[z3.ExprRef]): Expressions to search
+
+    Returns:
+        List[z3.ExprRef]: Distinct variables of [asts]
+    """
+    variables: Dict[int, z3.ExprRef] = {}
+    visited = set()
+    stack = list(reversed(asts))
+    while stack:
+        a = stack.pop()
+        if a.get_id() in visited:
+            continue
+        visited.add(a.get_id())
+        if z3.is_const(a) and a.decl().kind() == z3.Z3_OP_UNINTERPRETED:
+            variables[a.get_id()] = a
+        else:
+            stack.extend(reversed(a.children()))
+    return list(variables.values())
+
+
+def fingerprint(
+    op: str,
+    constraints: Iterable[claripy.ast.Base],
+    exprs: Iterable[claripy.ast.Base],
+) -> str:
+    """Compute a content-addressed key for a solver query
+
+    Variables are renamed positionally (v0, v1, ...) so that alpha-equivalent
+    queries, e.g. the same path through a block with differently-numbered
+    symbolic registers, share a key. Their sorts are part of the key, so queries
+    over differently-sized variables never collide.
+
+    Args:
+        op (str): Name of the solver operation
+        constraints (Iterable[claripy.ast.Base]): Constraints of the queried state
+        exprs (Iterable[claripy.ast.Base]): Expressions being solved for
+
+    Returns:
+        str: Hex digest identifying the query
+    """
+    asts = [claripy.backends.z3.convert(a) for a in (*constraints, *exprs)]
+    renaming = [
+        (v, z3.Const(f"v{i}", v.sort())) for i, v in enumerate(z3_variables(asts))
+    ]
+
+    h = hashlib.blake2b(op.encode(), digest_size=16)
+    for _, v in renaming:
+        h.update(b"\0")
+        h.update(f"{v} {v.sort().sexpr()}".encode())
+    for a in asts:
+        if renaming:
+            a = z3.substitute(a, *renaming)
+        h.update(b"\0")
+        h.update(a.sexpr().encode())
+    return h.hexdigest()
+
+
+def _get(key: str) -> Optional[str]:
+    """Fetch a stored result
+
+    Args:
+        key (str): Query fingerprint
+
+    Returns:
+        Optional[str]: Stored result, or None on a miss
+    """
+    conn = _connection()
+    if conn is None:
+        return None
+    row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+    return None if row is None else row[0]
+
+
+def _put(key: str, value: str):
+    """Store a result
+
+    Args:
+        key (str): Query fingerprint
+        value (str): Result to store
+    """
+    conn = _connection()
+    if conn is None:
+        return
+    conn.execute(
+        "INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, value)
+    )
+
+
+def _cached(
+    op: str,
+    state: angr.SimState,
+    expr: Union[claripy.ast.Base, int],
+    solve: Callable[[claripy.ast.Base], int],
+) -> int:
+    """Look up a query in the cache, solving and storing it on a miss
+
+    Args:
+        op (str): Name of the solver operation
+        state (angr.SimState): State to solve in
+        expr (Union[claripy.ast.Base, int]): Expression to solve for
+        solve (Callable[[claripy.ast.Base], int]): Solver operation to run on a miss
+
+    Returns:
+        int: Result of the query
+    """
+    # Concrete expressions never reach Z3, not worth a round-trip to disk
+    if isinstance(expr, int):
+        return expr
+    if not expr.symbolic:
+        return state.solver.eval(expr)
+
+    key = fingerprint(op, state.solver.constraints, [expr])
+    value = _get(key)
+    if value is not None:
+        return int(value)
+
+    result = solve(expr)
+    _put(key, str(result))
+    return result
+
+
+def cached_eval(state: angr.SimState, expr: Union[claripy.ast.Base, int]) -> int:
+    """Cached equivalent of state.solver.eval
+
+    Args:
+        state (angr.SimState): State to solve in
+        expr (Union[claripy.ast.Base, int]): Expression to solve for
+
+    Returns:
+        int: A solution for expr
+    """
+    return _cached("eval", state, expr, state.solver.eval)
+
+
+def cached_min(state: angr.SimState, expr: claripy.ast.Base) -> int:
+    """Cached equivalent of state.solver.min
+
+    Args:
+        state (angr.SimState): State to solve in
+        expr (claripy.ast.Base): Expression to minimize
+
+    Returns:
+        int: Minimum solution for expr
+    """
+    return _cached("min", state, expr, state.solver.min)
+
+
+def cached_max(state: angr.SimState, expr: claripy.ast.Base) -> int:
+    """Cached equivalent of state.solver.max
+
+    Args:
+        state (angr.SimState): State to solve in
+        expr (claripy.ast.Base): Expression to maximize
+
+    Returns:
+        int: Maximum solution for expr
+    """
+    return _cached("max", state, expr, state.solver.max)
+
+
+def cached_model(
+    state: angr.SimState,
+    exprs: Sequence[claripy.ast.Base],
+    extra_constraints: Sequence[claripy.ast.bool.Bool] = (),
+) -> Optional[Tuple[int, ...]]:
+    """Cached joint solution for several expressions
+
+    Args:
+        state (angr.SimState): State to solve in
+        exprs (Sequence[claripy.ast.Base]): Expressions to solve for
+        extra_constraints (Sequence[claripy.ast.bool.Bool], optional): Constraints
+            to assume on top of the state's. Defaults to ().
+
+    Returns:
+        Optional[Tuple[int, ...]]: One solution for [exprs], or None if unsatisfiable
+    """
+    key = fingerprint("model", (*state.solver.constraints, *extra_constraints), exprs)
+    value = _get(key)
+    if value is not None:
+        model = json.loads(value)
+        return None if model is None else tuple(model)
+
+    result: Optional[Tuple[int, ...]] = None
+    if state.solver.satisfiable(extra_constraints=extra_constraints):
+        result = ()
+        if exprs:
+            result = tuple(
+                state.solver._solver.batch_eval(
+                    exprs, 1, extra_constraints=extra_constraints
+                )[0]
+            )
+    _put(key, json.dumps(result))
+    return result
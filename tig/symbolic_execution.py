@@ -1,6 +1,18 @@
-import pypcode, archinfo, angr, claripy
-from typing import List, Union, Optional, Any
+import pypcode, archinfo, angr, claripy, z3
+import numpy as np
+import functools, multiprocessing, operator, uuid
+from itertools import filterfalse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple, Union, Optional, Any
 from tig.bininfo import BasicBlock, Function
+from tig.solver_cache import (
+    cached_eval,
+    cached_min,
+    cached_max,
+    cached_model,
+    z3_variables,
+)
 from enum import Enum
 import logging
 
@@ -10,9 +22,23 @@ logging.getLogger("pyvex").setLevel(logging.ERROR)
 logging.getLogger("cle").setLevel(logging.ERROR)
 
 
+@functools.lru_cache(maxsize=1)
+def _lang_index() -> Dict[str, pypcode.ArchLanguage]:
+    """Map every SPARC identifier known to pypcode to its language definition
+
+    Returns:
+        Dict[str, pypcode.ArchLanguage]: Map from SPARC identifier to language
+    """
+    return {l.id: l for arch in pypcode.Arch.enumerate() for l in arch.languages}
+
+
+@functools.lru_cache(maxsize=8)
 def get_project(bin_path: str, lang: str = "RISCV:LE:32:default") -> angr.Project:
     """Get an angr Project using pypcode
 
+    The most recently used Projects are cached on (bin_path, lang), so repeated
+    calls for the same binary share a single Project.
+
     Args:
         bin_path (str): Path to binary of output Project
         lang (str, optional): SPARC identifier for assembly language.
@@ -25,22 +51,35 @@ def get_project(bin_path: str, lang: str = "RISCV:LE:32:default") -> angr.Projec
     Returns:
         angr.Project: Project object for provided binary
     """
-    sparc_lang = None
-    for arch in pypcode.Arch.enumerate():
-        for l in arch.languages:
-            if l.id == lang:
-                sparc_lang = l
-                break
-        if sparc_lang is not None:
-            break
+    sparc_lang = _lang_index().get(lang)
     if sparc_lang is None:
         raise Exception(f"Unable to find SPARC language for {lang}")
 
     pcode_arch = archinfo.ArchPcode(sparc_lang)
 
+    # claripy only drives Z3, there is no bitwuzla/cvc5 backend to select here.
+    # Solver time is instead cut by tig.solver_cache and batched queries.
     return angr.Project(bin_path, arch=pcode_arch, auto_load_libs=False)
 
 
+def get_cfg(p: angr.Project) -> angr.analyses.CFGFast:
+    """Get a CFGFast analysis of a Project, computing it only once per Project
+
+    The analysis is stored on the Project itself, so it lives exactly as long as
+    the Project does.
+
+    Args:
+        p (angr.Project): Project to analyze
+
+    Returns:
+        angr.analyses.CFGFast: CFG of [p]
+    """
+    cfg = getattr(p, "_tig_cfg", None)
+    if cfg is None:
+        cfg = p._tig_cfg = p.analyses.CFGFast()
+    return cfg
+
+
 class ConstraintType(Enum):
     Unknown = 0
     BranchTrue = 1
@@ -57,24 +96,96 @@ class Constraint:
         next_addr: Optional[int],
     ):
         self.type = t
-        self.constraints: List[claripy.ast.bool.Bool] = [
-            b
-            for b in (
-                [constraints]
-                if type(constraints) == claripy.ast.bool.Bool
-                else constraints
-            )
-            if not b.is_true()
-        ]
+        cs = (
+            (constraints,)
+            if isinstance(constraints, claripy.ast.bool.Bool)
+            else constraints
+        )
+        self.constraints: List[claripy.ast.bool.Bool] = list(
+            filterfalse(operator.methodcaller("is_true"), cs)
+        )
         self.next_addr = next_addr
 
     def add_constraints(self, l: List[claripy.ast.bool.Bool]):
-        self.constraints += l
+        self.constraints.extend(filterfalse(operator.methodcaller("is_true"), l))
 
     def __repr__(self):
         return f"Constraints ({self.type}) -> {self.next_addr}: {self.constraints}"
 
 
+class ConstraintTable:
+    """A collection of Constraints, stored as parallel arrays
+
+    Types and next addresses are kept in NumPy arrays so tables can be filtered
+    in bulk. Rows whose next address is None are False in has_next_addr.
+    """
+
+    def __init__(
+        self,
+        types: np.ndarray,
+        next_addrs: np.ndarray,
+        has_next_addr: np.ndarray,
+        constraints: List[List[claripy.ast.bool.Bool]],
+    ):
+        self.types = types
+        self.next_addrs = next_addrs
+        self.has_next_addr = has_next_addr
+        self.constraints = constraints
+
+    @classmethod
+    def from_constraints(cls, constraints: Sequence[Constraint]) -> "ConstraintTable":
+        """Build a table from individual Constraints
+
+        Args:
+            constraints (Sequence[Constraint]): Constraints to store
+
+        Returns:
+            ConstraintTable: Table holding [constraints]
+        """
+        return cls(
+            np.array([c.type.value for c in constraints], dtype=np.int8),
+            np.array(
+                [0 if c.next_addr is None else c.next_addr for c in constraints],
+                dtype=np.uint64,
+            ),
+            np.array([c.next_addr is not None for c in constraints], dtype=bool),
+            [c.constraints for c in constraints],
+        )
+
+    def select(self, t: ConstraintType) -> "ConstraintTable":
+        """Get the rows of a given type
+
+        Args:
+            t (ConstraintType): Type to keep
+
+        Returns:
+            ConstraintTable: Table holding only rows of type [t]
+        """
+        mask = self.types == t.value
+        return ConstraintTable(
+            self.types[mask],
+            self.next_addrs[mask],
+            self.has_next_addr[mask],
+            [cs for cs, keep in zip(self.constraints, mask) if keep],
+        )
+
+    def __len__(self):
+        return len(self.constraints)
+
+    def __getitem__(self, idx) -> Constraint:
+        return Constraint(
+            ConstraintType(int(self.types[idx])),
+            self.constraints[idx],
+            int(self.next_addrs[idx]) if self.has_next_addr[idx] else None,
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __repr__(self):
+        return "\n".join(repr(c) for c in self)
+
+
 def solve_opt(state: angr.SimState, to_solve: str, default: Any) -> Any:
     """Try solving for a value, and return a default if an error occurs
 
@@ -87,30 +198,87 @@ def solve_opt(state: angr.SimState, to_solve: str, default: Any) -> Any:
         Any: Default value if an error has occurred
     """
     try:
-        return state.solver.eval(getattr(state, to_solve))
-    except:
+        return cached_eval(state, getattr(state, to_solve))
+    except (angr.errors.SimError, claripy.errors.ClaripyError):
         return default
 
 
 def reg_constraints(
     state: angr.SimState, bb: BasicBlock
 ) -> List[claripy.ast.bool.Bool]:
-    regs_written = set()
-    for i in bb:
-        regs_written |= set(i.regs_written)
+    """Compute bounds on the registers written by a BasicBlock
+
+    Args:
+        state (angr.SimState): State after executing [bb]
+        bb (BasicBlock): Block whose written registers should be bounded
+
+    Returns:
+        List[claripy.ast.bool.Bool]: Range constraints on the written registers
+    """
+    # Concrete registers only yield trivially-true bounds, so skip the solver
+    regs = [getattr(state.regs, reg) for reg in bb.regs_written_set]
+    regs = [reg for reg in regs if reg.symbolic]
+    if not regs:
+        return []
+
+    # A single joint solution means every register is pinned to one value
+    solutions = state.solver._solver.batch_eval(regs, 2)
+    if len(solutions) == 1:
+        return [reg == val for reg, val in zip(regs, solutions[0])]
 
     out = []
-    for reg in regs_written:
-        reg = getattr(state.regs, reg)
-        min, max = state.solver.min(reg), state.solver.max(reg)
+    for reg, first, second in zip(regs, *solutions):
+        # Registers that took the same value in both solutions may be singletons,
+        # which is cheaper to confirm than computing both extrema
+        if first == second and state.solver.unique(reg):
+            out.append(reg == first)
+            continue
+
+        min, max = cached_min(state, reg), cached_max(state, reg)
 
+        # Only emit bounds that are tighter than the register's full range
         if min == max:
             out.append(reg == min)
         else:
-            out.append(min <= reg)
-            if max < 2**32:
-                out.append(reg < max)
-    return [x for x in out if not x.is_true()]
+            if min > 0:
+                out.append(min <= reg)
+            if max < (1 << reg.size()) - 1:
+                out.append(reg <= max)
+    return out
+
+
+def _state_constraint(
+    t: ConstraintType, state: angr.SimState, bb: BasicBlock
+) -> Constraint:
+    """Collect a successor's path and register constraints into a Constraint
+
+    Args:
+        t (ConstraintType): Type of the resulting Constraint
+        state (angr.SimState): Successor state of [bb]
+        bb (BasicBlock): Block that was executed
+
+    Returns:
+        Constraint: Constraints of [state], pointing to its address
+    """
+    cs = list(state.solver.constraints) + reg_constraints(state, bb)
+    return Constraint(t, cs, solve_opt(state, "addr", None))
+
+
+def _merge_on_path_constraints(*states: angr.SimState) -> angr.SimState:
+    """Merge states, using their own path constraints as the merge conditions
+
+    Unlike angr's default merge, this introduces no state_merge flag variables
+    into the merged state's constraints.
+
+    Args:
+        states (angr.SimState): States to merge
+
+    Returns:
+        angr.SimState: Merged state
+    """
+    conditions = [claripy.And(*s.solver.constraints) for s in states]
+    merged, _, _ = states[0].merge(*states[1:], merge_conditions=conditions)
+    return merged
 
 
 class StashMonitor(angr.exploration_techniques.ExplorationTechnique):
@@ -121,18 +289,19 @@ class StashMonitor(angr.exploration_techniques.ExplorationTechnique):
         self.verbose = verbose
 
     def step(self, simgr, stash="active", **kwargs):
+        if not self.verbose:
+            return simgr.step(stash=stash, **kwargs)
+
         # Print pre-step information
-        if self.verbose:
-            print("\nBefore step:")
-            self._print_stashes(simgr)
+        print("\nBefore step:")
+        self._print_stashes(simgr)
 
         # Execute the step
         simgr = simgr.step(stash=stash, **kwargs)
 
         # Print post-step information
-        if self.verbose:
-            print("\nAfter step:")
-            self._print_stashes(simgr)
+        print("\nAfter step:")
+        self._print_stashes(simgr)
 
         return simgr
 
@@ -148,145 +317,426 @@ class StashMonitor(angr.exploration_techniques.ExplorationTechnique):
                 print("]")
 
 
+def print_writes(state: angr.SimState):
+    """Install breakpoints that print every memory and register write
+
+    Args:
+        state (angr.SimState): State to instrument
+    """
+
+    def print_mem_write(state):
+        print(
+            "Write", state.inspect.mem_write_expr, "to", state.inspect.mem_write_address
+        )
+
+    def print_reg_write(state):
+        reg_offset = state.inspect.reg_write_offset  # Get the register offset
+        reg_name = state.arch.register_names.get(reg_offset, f"Unknown({reg_offset})")
+        print("Write", state.inspect.reg_write_expr, "to", reg_name)
+
+    state.inspect.b("mem_write", when=angr.BP_AFTER, action=print_mem_write)
+    state.inspect.b("reg_write", when=angr.BP_AFTER, action=print_reg_write)
+
+
 def make_static_memory_symbolic(
-    project: angr.Project, state: angr.SimState, chunk_size: int = 4
+    project: angr.Project, state: angr.SimState, chunk_size: Optional[int] = 4
 ):
     """Overwrite .data and .bss sections with symbolic values
 
     Args:
         project (angr.Project): Project for target binary
         state (angr.SimState): State to write into
-        chunk_size (int, optional): Size in bytes of symbolic chunks. Defaults to 4.
+        chunk_size (Optional[int], optional): Size in bytes of symbolic chunks. If None,
+                                              each section is one symbolic value, which
+                                              makes every query on it far slower for
+                                              large sections. Defaults to 4.
     """
     # Get section information
     data_section = project.loader.main_object.sections_map[".data"]
     bss_section = project.loader.main_object.sections_map[".bss"]
 
-    # Process .data section
-    for addr in range(data_section.min_addr, data_section.max_addr, chunk_size):
-        sym_name = f"data_{hex(addr)}"
-        symbolic_value = state.solver.BVS(sym_name, chunk_size * 8)
-        state.memory.store(addr, symbolic_value)
-
-    # Process .bss section
-    for addr in range(bss_section.min_addr, bss_section.max_addr, chunk_size):
-        sym_name = f"bss_{hex(addr)}"
-        symbolic_value = state.solver.BVS(sym_name, chunk_size * 8)
-        state.memory.store(addr, symbolic_value)
+    # Initialization writes skip breakpoints and SimActions, nothing should see them
+    for prefix, section in (("data", data_section), ("bss", bss_section)):
+        if section.memsize == 0:
+            continue
+
+        if chunk_size is None:
+            # One value per section, every load becomes an Extract of it
+            sym_name = f"{prefix}_{hex(section.min_addr)}"
+            symbolic_value = state.solver.BVS(sym_name, section.memsize * 8)
+            state.memory.store(
+                section.min_addr, symbolic_value, disable_actions=True, inspect=False
+            )
+            continue
+
+        addrs = range(section.min_addr, section.max_addr, chunk_size)
+        sym_names = ["%s_%#x" % (prefix, addr) for addr in addrs]
+        for addr, sym_name in zip(addrs, sym_names):
+            symbolic_value = state.solver.BVS(sym_name, chunk_size * 8)
+            state.memory.store(
+                addr, symbolic_value, disable_actions=True, inspect=False
+            )
 
     return state
 
 
-def exec_func(p: angr.Project, func: Function) -> List[claripy.ast.bool.Bool]:
+def exec_func(
+    p: angr.Project,
+    func: Function,
+    max_paths: int = 16,
+    veritesting: bool = False,
+    debug: bool = False,
+) -> Iterator[Tuple[claripy.ast.bool.Bool, ...]]:
     """Symbolically executes a function and computes input constraints
 
+    Paths are explored depth-first and yielded as soon as they reach a return.
+
     Args:
         p (angr.Project): Project for target binary
         func (Function): Function to run
-
-    Returns:
-        List[claripy.ast.bool.Bool]: Constraints corresponding to control-flow paths through the function
+        max_paths (int, optional): Maximum number of paths to yield. Defaults to 16.
+        veritesting (bool, optional): Merge states at post-dominators with Veritesting.
+                                      Defaults to False.
+        debug (bool, optional): Print memory/register writes and stashes at each step.
+                                Defaults to False.
+
+    Yields:
+        Tuple[claripy.ast.bool.Bool, ...]: Constraints corresponding to a control-flow path through the function
     """
     state: angr.SimState = p.factory.blank_state(addr=func.entry_point)
-    state = make_static_memory_symbolic(p, state, chunk_size=4)
+    state = make_static_memory_symbolic(p, state)
 
-    def print_mem_write(state):
-        print(
-            "Write", state.inspect.mem_write_expr, "to", state.inspect.mem_write_address
-        )
-
-    def print_reg_write(state):
-        reg_offset = state.inspect.reg_write_offset  # Get the register offset
-        reg_name = state.arch.register_names.get(reg_offset, f"Unknown({reg_offset})")
-        print("Write", state.inspect.reg_write_expr, "to", reg_name)
-
-    state.inspect.b("mem_write", when=angr.BP_AFTER, action=print_mem_write)
-    state.inspect.b("reg_write", when=angr.BP_AFTER, action=print_reg_write)
+    if debug:
+        print_writes(state)
 
     sm = p.factory.simgr(state)
 
     regions = [(func.entry_point, ret) for ret in func.return_addrs]
     in_regions = lambda addr: any([e <= addr <= r for e, r in regions])
-    cfg = p.analyses.CFGFast()
+    cfg = get_cfg(p)
     f = cfg.kb.functions.function(name=func.name)
     if f is None:
         print("Can't find function", func.name)
-        return []
+        return
     sm.use_technique(angr.exploration_techniques.LoopSeer(cfg=cfg, bound=5))
-    sm.use_technique(StashMonitor())
-
-    sm.explore(
-        find=func.return_addrs,
-        # avoid=(lambda s: not (in_regions(s.addr))), # change this eventually, we do want function calls but we want to step over them if possible
-        num_find=100,
+    if veritesting:
+        sm.use_technique(
+            angr.exploration_techniques.Veritesting(boundaries=func.return_addrs)
+        )
+    sm.use_technique(angr.exploration_techniques.DFS())
+    sm.use_technique(
+        angr.exploration_techniques.Explorer(
+            find=func.return_addrs,
+            # avoid=(lambda s: not (in_regions(s.addr))), # change this eventually, we do want function calls but we want to step over them if possible
+            num_find=max_paths,
+        )
     )
+    if debug:
+        sm.use_technique(StashMonitor())
+
+    # Hand off found states as they appear instead of holding every one
+    found = 0
+    while sm.active and found < max_paths:
+        sm.step()
+        for s in sm.found[: max_paths - found]:
+            yield tuple(s.solver.constraints)
+            found += 1
+        sm.drop(stash="found")
+
+
+def exec_func_concolic(
+    p: angr.Project,
+    func: Function,
+    seed_inputs: List[Dict[str, int]],
+    max_paths: int = 16,
+    max_steps: int = 1000,
+    max_seeds: int = 64,
+) -> Iterator[Tuple[claripy.ast.bool.Bool, ...]]:
+    """Concolically executes a function, following one concrete path at a time
+
+    Each seed maps input registers to concrete values. The path driven by a seed is
+    followed step by step, and every feasible branch direction it does not take
+    queues a new seed that drives execution down that direction.
+
+    Only the registers named in [seed_inputs] are treated as inputs. A branch that
+    depends on anything else, e.g. static memory, cannot be steered by a seed, so
+    its untaken direction yields an already-seen seed and is not explored.
 
-    return [s.solver.constraints for s in sm.found]
+    Args:
+        p (angr.Project): Project for target binary
+        func (Function): Function to run
+        seed_inputs (List[Dict[str, int]]): Initial concrete register values
+        max_paths (int, optional): Maximum number of paths to yield. Defaults to 16.
+        max_steps (int, optional): Maximum number of steps along a single path.
+                                   Defaults to 1000.
+        max_seeds (int, optional): Maximum number of seeds to execute in total.
+                                   Defaults to 64.
+
+    Yields:
+        Tuple[claripy.ast.bool.Bool, ...]: Constraints corresponding to a control-flow path through the function
+    """
+    entry: angr.SimState = p.factory.blank_state(addr=func.entry_point)
+    entry = make_static_memory_symbolic(p, entry)
+    inputs = {
+        name: getattr(entry.regs, name)
+        for name in sorted({name for seed in seed_inputs for name in seed})
+    }
+    return_addrs = set(func.return_addrs)
+
+    worklist = deque(seed_inputs or [{}])
+    seen_seeds, seen_paths = set(), set()
+    found = 0
+    while worklist and found < max_paths and len(seen_seeds) < max_seeds:
+        seed = worklist.popleft()
+        if tuple(sorted(seed.items())) in seen_seeds:
+            continue
+        seen_seeds.add(tuple(sorted(seed.items())))
+        concrete = [inputs[name] == val for name, val in seed.items()]
+
+        state, path = entry.copy(), []
+        for _ in range(max_steps):
+            addr = solve_opt(state, "addr", None)
+            if addr is None:
+                break
+            path.append(addr)
+
+            if return_addrs.intersection(state.block().instruction_addrs):
+                if tuple(path) not in seen_paths:
+                    seen_paths.add(tuple(path))
+                    yield tuple(state.solver.constraints)
+                    found += 1
+                break
+
+            taken = None
+            for succ in p.factory.successors(state).flat_successors:
+                if taken is None and cached_model(succ, [], concrete) is not None:
+                    taken = succ
+                    continue
+                # Direction not taken by this seed, queue a seed that takes it
+                model = cached_model(succ, list(inputs.values()))
+                if model is not None:
+                    worklist.append(dict(zip(inputs, model)))
+
+            if taken is None:
+                break
+            state = taken
 
 
 def exec_bb(
-    p: angr.Project, bb: BasicBlock, input_constraints: List[Constraint]
-) -> List[Constraint]:
+    p: angr.Project,
+    bb: BasicBlock,
+    input_constraints: List[claripy.ast.bool.Bool],
+    debug: bool = False,
+) -> ConstraintTable:
     """Symbolically execute a BasicBlock and retrieve its constraints
 
+    If [bb] has a single successor, only its path constraints are returned; use
+    reg_constraints to bound the registers it writes.
+
     Args:
         p (angr.Project): Project for targeted binary
         bb (BasicBlock): Block to execute
+        input_constraints (List[claripy.ast.bool.Bool]): Constraints assumed on entry
+                                                         to [bb]
+        debug (bool, optional): Print memory and register writes. Defaults to False.
 
     Returns:
-        List[Constraint]: List of constraints, annotated with their type
+        ConstraintTable: Table of constraints, annotated with their type
     """
 
-    # Setup input state
-    state = p.factory.blank_state(addr=bb.start_vaddr)
+    # Setup input state, it is stepped once and never reused so needn't be copied
+    state = p.factory.blank_state(
+        addr=bb.start_vaddr, remove_options={angr.options.COPY_STATES}
+    )
     for c in input_constraints:
         state.solver.add(c)
 
-    # Setup breakpoints on memory and register writes
-    state.inspect.b("mem_write", when=angr.BP_AFTER)
-    state.inspect.b("reg_write", when=angr.BP_AFTER)
+    if debug:
+        print_writes(state)
 
     sm = p.factory.simgr(state, save_unconstrained=True)
 
     sm.step()
+    successors = len(sm.active)
+
+    # Successors that landed on the same address can be merged into one state,
+    # except for the two sides of a branch, which are classified below
+    if successors > 2:
+        addrs = [solve_opt(s, "addr", None) for s in sm.active]
+        if None not in addrs and len(set(addrs)) < len(addrs):
+            sm.merge(merge_func=_merge_on_path_constraints, stash="active")
+
+    # Straight-line blocks have a single successor and nothing to classify
+    if successors == 1 and not sm.unconstrained and not sm.deadended:
+        s = sm.active[0]
+        return ConstraintTable.from_constraints(
+            [
+                Constraint(
+                    ConstraintType.Unknown,
+                    s.solver.constraints,
+                    solve_opt(s, "addr", None),
+                )
+            ]
+        )
 
-    """
     out = []
-    if len(sm.active) == 2:
-        true_addr = solve_opt(sm.active[0], "addr", None)
-        out.append(Constraint(ConstraintType.BranchTrue, sm.active[0].solver.constraints, true_addr))
-        out[-1].add_constraints(reg_constraints(sm.active[0], bb))
-        false_addr = solve_opt(sm.active[1], "addr", None)
-        out.append(Constraint(ConstraintType.BranchFalse, sm.active[1].solver.constraints, false_addr))
-        out[-1].add_constraints(reg_constraints(sm.active[1], bb))
+    if successors == 2:
+        out.append(_state_constraint(ConstraintType.BranchTrue, sm.active[0], bb))
+        out.append(_state_constraint(ConstraintType.BranchFalse, sm.active[1], bb))
     else:
         for s in sm.active:
-            addr = solve_opt(s, "addr", None)
-            for c in s.solver.constraints:
-                out.append(Constraint(ConstraintType.Unknown, c, addr))
-                out[-1].add_constraints(reg_constraints(s, bb))
+            out.append(_state_constraint(ConstraintType.Unknown, s, bb))
     for s in sm.deadended:
-        addr = solve_opt(s, "addr", None)
-        for c in s.solver.constraints:
-            out.append(Constraint(ConstraintType.DeadEnd, c, addr))
-            out[-1].add_constraints(reg_constraints(s, bb))
+        out.append(_state_constraint(ConstraintType.DeadEnd, s, bb))
     for s in sm.unconstrained:
-        addr = solve_opt(s, "addr", None)
-        for c in s.solver.constraints:
-            out.append(Constraint(ConstraintType.Unconstrained, c, addr))
-            out[-1].add_constraints(reg_constraints(s, bb))
+        out.append(_state_constraint(ConstraintType.Unconstrained, s, bb))
     for s in sm.pruned + sm.unsat:
-        addr = solve_opt(s, "addr", None)
-        for c in s.solver.constraints:
-            out.append(Constraint(ConstraintType.Unknown, c, addr))
-            out[-1].add_constraints(reg_constraints(s, bb))
-
-    # for i in range(len(out)):
-    #     constraints = out[i].con
-    #     if type(constraints) == list:
-    #         out[i] = (out[i][0], [x for x in constraints if not x.is_true()])
-    #     elif type(constraints) == claripy.ast.bool.Bool:
-    #         out[i] = (out[i][0], ([constraints] if not constraints.is_true() else []))"
+        out.append(_state_constraint(ConstraintType.Unknown, s, bb))
+
+    return ConstraintTable.from_constraints(out)
+
+
+# Prefix given to input variables inside a worker, so they can't collide with
+# variables the worker creates itself
+_INPUT_PREFIX = "tig_input_"
+
+
+def _rename_variables(
+    exprs: List[z3.ExprRef], rename: Callable[[str], str]
+) -> List[z3.ExprRef]:
+    """Rename every variable in Z3 expressions
+
+    Args:
+        exprs (List[z3.ExprRef]): Expressions to rename variables in
+        rename (Callable[[str], str]): Map from old to new variable names
+
+    Returns:
+        List[z3.ExprRef]: [exprs] with variables renamed
+    """
+    renaming = [
+        (v, z3.Const(rename(v.decl().name()), v.sort())) for v in z3_variables(exprs)
+    ]
+    if not renaming:
+        return exprs
+    return [z3.substitute(e, *renaming) for e in exprs]
+
+
+def _serialize_constraints(
+    constraints: List[claripy.ast.bool.Bool],
+    rename: Optional[Callable[[str], str]] = None,
+) -> str:
+    """Serialize constraints to SMT-LIB so they can cross a process boundary
+
+    Args:
+        constraints (List[claripy.ast.bool.Bool]): Constraints to serialize
+        rename (Optional[Callable[[str], str]], optional): Map from old to new
+                                                           variable names.
+                                                           Defaults to None.
+
+    Returns:
+        str: SMT-LIB script asserting [constraints]
+    """
+    exprs = [claripy.backends.z3.convert(c) for c in constraints]
+    if rename is not None:
+        exprs = _rename_variables(exprs, rename)
+    solver = z3.Solver()
+    solver.add(*exprs)
+    return solver.to_smt2()
+
+
+def _deserialize_constraints(
+    smt2: str, rename: Optional[Callable[[str], str]] = None
+) -> List[claripy.ast.bool.Bool]:
+    """Inverse of _serialize_constraints
+
+    Args:
+        smt2 (str): SMT-LIB script produced by _serialize_constraints
+        rename (Optional[Callable[[str], str]], optional): Map from old to new
+                                                           variable names.
+                                                           Defaults to None.
+
+    Returns:
+        List[claripy.ast.bool.Bool]: Constraints asserted by [smt2]
     """
+    exprs = list(z3.parse_smt2_string(smt2))
+    if rename is not None:
+        exprs = _rename_variables(exprs, rename)
+    return [claripy.backends.z3._abstract(e) for e in exprs]
+
+
+def _exec_bb_worker(
+    job: Tuple[str, str, BasicBlock, str, str],
+) -> List[Tuple[ConstraintType, str, Optional[int]]]:
+    """Run exec_bb in a worker process on serialized inputs and outputs
 
-    return []
+    Each worker numbers fresh variables from scratch, so its names could clash
+    with the parent's or another worker's. Inputs are renamed apart on the way in
+    and restored on the way out, and the worker's own variables get the job's
+    unique prefix.
+
+    Args:
+        job (Tuple[str, str, BasicBlock, str, str]): Binary path, SPARC identifier,
+                                                     block to execute, serialized
+                                                     input constraints, and prefix
+                                                     for fresh variables
+
+    Returns:
+        List[Tuple[ConstraintType, str, Optional[int]]]: Serialized output constraints
+    """
+    bin_path, lang, bb, smt2, prefix = job
+    p = get_project(bin_path, lang)
+    inputs = _deserialize_constraints(smt2, lambda name: _INPUT_PREFIX + name)
+    out = exec_bb(p, bb, inputs)
+
+    def restore(name: str) -> str:
+        if name.startswith(_INPUT_PREFIX):
+            return name[len(_INPUT_PREFIX) :]
+        return prefix + name
+
+    return [
+        (c.type, _serialize_constraints(c.constraints, restore), c.next_addr)
+        for c in out
+    ]
+
+
+def exec_bbs(
+    bin_path: str,
+    bbs: List[BasicBlock],
+    input_constraints: List[List[claripy.ast.bool.Bool]],
+    lang: str = "RISCV:LE:32:default",
+    workers: Optional[int] = None,
+) -> List[ConstraintTable]:
+    """Symbolically execute independent BasicBlocks in parallel worker processes
+
+    Args:
+        bin_path (str): Path to targeted binary
+        bbs (List[BasicBlock]): Blocks to execute
+        input_constraints (List[List[claripy.ast.bool.Bool]]): Input constraints
+                                                               for each block
+        lang (str, optional): SPARC identifier for assembly language.
+                              Defaults to "RISCV:LE:32:default".
+        workers (Optional[int], optional): Number of worker processes.
+                                           Defaults to the number of CPUs.
+
+    Returns:
+        List[ConstraintTable]: Output of exec_bb for each block. Variables created
+                               while executing a block are prefixed uniquely to
+                               its job, as separate processes name them independently
+    """
+    jobs = [
+        (bin_path, lang, bb, _serialize_constraints(cs), f"{uuid.uuid4().hex[:8]}_")
+        for bb, cs in zip(bbs, input_constraints, strict=True)
+    ]
+
+    # Spawn rather than fork, angr and Z3 state is not fork-safe
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return [
+            ConstraintTable.from_constraints(
+                [
+                    Constraint(t, _deserialize_constraints(smt2), addr)
+                    for t, smt2, addr in out
+                ]
+            )
+            for out in pool.map(_exec_bb_worker, jobs)
+        ]
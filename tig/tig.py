@@ -7,6 +7,7 @@ from tig.extract_basic_blocks import extract_bb
 from tig.bininfo import Instruction, BasicBlock, Function
 from tig.tree import compute_dominator_tree, preorder_traversal
 from tig.symbolic_execution import get_project, ConstraintType, exec_bb, exec_func
+from tig.solver_cache import set_cache_path
 
 
 def time_of_riscv_instr(
@@ -151,7 +152,9 @@ def time_of_basic_block(
         return f"{' + '.join(times + [parens(final_time)])}", None
 
 
-def generate_timing_invariants(bin_path: str, func: Function) -> Dict[int, str]:
+def generate_timing_invariants(
+    bin_path: str, func: Function, debug: bool = False
+) -> Dict[int, str]:
     # Start up angr
 
     # Invariant points are:
@@ -165,7 +168,7 @@ def generate_timing_invariants(bin_path: str, func: Function) -> Dict[int, str]:
     # For each node
 
     p = get_project(bin_path)
-    print(exec_func(p, func))
+    print(list(exec_func(p, func, debug=debug)))
     # for block in func:
     #     print(f"====={block.start_vaddr}=====")
     #     print(exec_bb(p, block, []))
@@ -183,8 +186,13 @@ def main():
     parser.add_argument("--disas", action="store_true")
     parser.add_argument("--addr-offset", default=None, type=int)
     parser.add_argument("--out-file", default=None, type=str)
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--no-solver-cache", action="store_true")
     args = parser.parse_args()
 
+    if args.no_solver_cache:
+        set_cache_path(None)
+
     if args.disas:
         result = subprocess.run(
             [
@@ -218,7 +226,7 @@ def main():
             for instr in block:
                 instr.offset += args.addr_offset
 
-    invs = generate_timing_invariants(args.bin, func)
+    invs = generate_timing_invariants(args.bin, func, debug=args.debug)
 
     # invs = rocq_of_invariants(args.func, invs)
     # if args.out_file is None: